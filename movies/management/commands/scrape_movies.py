@@ -1,17 +1,28 @@
 import asyncio
 import logging
-from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import date
 from django.db import transaction
 from django.core.management.base import BaseCommand
-from typing import List, Dict, Optional
-from playwright.async_api import async_playwright
+from functools import lru_cache
+from typing import List, Optional
+from playwright.async_api import Browser, Route, async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
 from movies.models import Movie, Genre, TitleType
+from movies.parsing import SEL_ITEM, MovieRow, extract_movies
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_GENRE_VALUES = frozenset(g.value for g in Genre)
+_TITLE_TYPE_VALUES = tuple(t.value for t in TitleType)
+
+
+@lru_cache(maxsize=1)
+def _today_str(day_ordinal: int) -> str:
+    """Returns the date for the given day ordinal as YYYY-MM-DD, formatted once per day."""
+    return date.fromordinal(day_ordinal).strftime("%Y-%m-%d")
+
 
 class Command(BaseCommand):
     help = "Scrape IMDb movies by genre and store in the database"
@@ -20,6 +31,18 @@ class Command(BaseCommand):
         'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     }
 
+    # Resource types the scraper never reads; the poster alt text is in the DOM
+    BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+    # How long to wait for the next batch of titles after clicking "50 more"
+    LOAD_MORE_TIMEOUT_MS = 15000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Chromium is launched lazily and shared by every fetch of this command
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = None
+
     def add_arguments(self, parser):
         """
         Adds command-line arguments for the scraper script.
@@ -37,8 +60,8 @@ class Command(BaseCommand):
         """
         parser.add_argument("--genre", type=str,
                             required=True, help="Genre of the movies")
-        parser.add_argument("--title_type", type=str, choices=[
-                            t.value for t in TitleType], default=TitleType.FEATURE.value, help="Type of the title (default: feature)")
+        parser.add_argument("--title_type", type=str, choices=_TITLE_TYPE_VALUES,
+                            default=TitleType.FEATURE.value, help="Type of the title (default: feature)")
         parser.add_argument("--user_rating", type=float,
                             help="User rating (1.0 to 10.0)")
         parser.add_argument("--num_votes", type=int,
@@ -61,16 +84,16 @@ class Command(BaseCommand):
             ValueError: If the genre is not valid, user_rating is out of range, or release_year 
                         is not within the acceptable range (1900 to the current year).
         """
-        if genre not in [g.value for g in Genre]:
+        if genre not in _GENRE_VALUES:
             raise ValueError(
-                f"Invalid genre: {genre}. Valid options are {[g.value for g in Genre]}.")
+                f"Invalid genre: {genre}. Valid options are {sorted(_GENRE_VALUES)}.")
 
         if user_rating is not None and not (1.0 <= user_rating <= 10.0):
             raise ValueError(
                 "User rating must be a float between 1.0 and 10.0.")
 
         if release_year is not None:
-            current_year = datetime.now().year
+            current_year = date.today().year
             if release_year < 1900 or release_year > current_year:
                 raise ValueError(
                     f"Release year must be between 1900 and {current_year}.")
@@ -89,159 +112,162 @@ class Command(BaseCommand):
         Returns:
             str: The constructed URL for scraping.
         """
-        url = f"{self.BASE_URL}?title_type={title_type}&genres={genre}"
-        current_date = datetime.now().strftime("%Y-%m-%d")
+        parts = [f"{self.BASE_URL}?title_type={title_type}", f"genres={genre}"]
 
         if user_rating:
-            url += f"&user_rating={user_rating},10"
+            parts.append(f"user_rating={user_rating},10")
         if num_votes:
-            url += f"&num_votes={num_votes},"
+            parts.append(f"num_votes={num_votes},")
         if release_year:
-            url += f"&release_date={release_year}-01-01,{current_date}"
+            current_date = _today_str(date.today().toordinal())
+            parts.append(f"release_date={release_year}-01-01,{current_date}")
+
+        return "&".join(parts)
+
+    def _prepare(self, options: dict) -> str:
+        """
+        Validates the parsed command options and builds the search URL from them.
+
+        Args:
+            options (dict): The options passed to handle().
+
+        Returns:
+            str: The constructed URL for scraping.
+
+        Raises:
+            ValueError: If any option fails validation.
+        """
+        genre = options["genre"]
+        user_rating = options.get("user_rating")
+        release_year = options.get("release_year")
+
+        self.validate_arguments(genre, user_rating, release_year)
+        return self.construct_url(
+            genre, options["title_type"], user_rating, options.get("num_votes"), release_year)
+
+    async def get_browser(self) -> Browser:
+        """
+        Returns the shared headless Chromium instance, launching it on first use.
+
+        Returns:
+            Browser: The Playwright browser reused across all fetches of this command.
+        """
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+
+        async with self._browser_lock:
+            if self._browser is None:
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+        return self._browser
 
-        return url
+    async def close_browser(self) -> None:
+        """
+        Closes the shared browser and stops Playwright if they were started.
+        """
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def block_heavy_resources(self, route: Route) -> None:
+        """
+        Aborts requests for resources that are not needed to read the result list.
+
+        Args:
+            route (Route): The intercepted Playwright route.
+        """
+        if route.request.resource_type in self.BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
 
     async def fetch_all_pages_with_playwright(self, url: str, page_count: int) -> Optional[str]:
         """
-        Fetches content from all pages using Playwright, simulating user interaction where needed.
+        Loads the requested number of pages into one result list using Playwright, simulating
+        user interaction where needed.
 
         Args:
             url (str): The URL of the first page to fetch.
             page_count (int): The number of pages to fetch.
 
         Returns:
-            Optional[str]: Combined content of all fetched pages, or None if an error occurs.
+            Optional[str]: Content of the result page once all pages are loaded, or None if an
+                           error occurs.
 
         Logs:
             - Info when clicking the "50 more" button to load additional content.
             - Info when no "50 more" button is found.
+            - Info when no new titles load after clicking the button.
             - Error if an exception occurs during fetching.
         """
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                context = await browser.new_context()
-
+            browser = await self.get_browser()
+            context = await browser.new_context()
+            try:
                 await context.set_extra_http_headers(self.HEADERS)
+                await context.route("**/*", self.block_heavy_resources)
 
                 page = await context.new_page()
                 await page.goto(url)
+                # Wait for the first page to load
+                await page.wait_for_load_state("networkidle")
 
-                all_page_content = ""
-                for page_num in range(page_count):
-                    # Wait for the page to load and fetch the content
-                    await page.wait_for_load_state("networkidle")
-                    content = await page.content()
-                    all_page_content += content
-
+                for page_num in range(page_count - 1):
                     # Locate the "50 more" button using its class
                     button = page.locator("button.ipc-see-more__button")
                     if await button.count() > 0 and await button.is_visible():
+                        loaded = await page.locator(SEL_ITEM.css).count()
                         await button.click()  # Click the button to load more titles
                         logger.info(
-                            f"'50 more' button clicked on page {page_num + 1}")
-                        # Wait for the next set of content to load
-                        await page.wait_for_timeout(2000)
+                            "'50 more' button clicked on page %d", page_num + 1)
+                        # Wait until the next set of titles has been appended
+                        try:
+                            await page.wait_for_function(
+                                "([selector, loaded]) => document.querySelectorAll(selector).length > loaded",
+                                arg=[SEL_ITEM.css, loaded],
+                                timeout=self.LOAD_MORE_TIMEOUT_MS)
+                        except PlaywrightTimeoutError:
+                            logger.info(
+                                "No new titles loaded after page %d", page_num + 1)
+                            break
                     else:
                         logger.info(
-                            f"No '50 more' button found on page {page_num + 1}")
+                            "No '50 more' button found on page %d", page_num + 1)
                         break
 
-                await browser.close()
-                return all_page_content
+                # Each click appends to the same list, so the final DOM holds every
+                # loaded title exactly once
+                return await page.content()
+            finally:
+                await context.close()
         except Exception as e:
-            logger.error(f"Error fetching all pages with Playwright: {e}")
+            logger.error("Error fetching all pages with Playwright: %s", e)
             return None
 
-    async def scrape_page(self, url: str, pages: int) -> List[Dict]:
+    async def scrape_page(self, url: str, pages: int) -> List[MovieRow]:
         """
-        Scrapes the given page URL and returns a list of dictionaries containing the scraped data.
+        Scrapes the given page URL and returns a list of the scraped movies.
 
         Args:
             url (str): The URL of the page to scrape.
             pages (int): The number of pages to scrape.
 
         Returns:
-            List[Dict]: A list of dictionaries containing scraped data. Returns an empty list if no data is found.
+            List[MovieRow]: A list of scraped movies. Returns an empty list if no data is found.
         """
         page_content = await self.fetch_all_pages_with_playwright(url, pages)
         if not page_content:
             logger.info("Cannot scrape as page_content is None")
             return []
 
-        soup = BeautifulSoup(page_content, "html.parser")
-        # with open("output.html", "w", encoding="utf-8") as file:
-        #     file.write(soup.prettify())
-
-        # Find all movie containers
-        movie_containers = soup.find_all(
-            "li", class_="ipc-metadata-list-summary-item")
-        movies = []
-
-        for container in movie_containers:
-            try:
-                # Extract title
-                title_tag = container.find("h3", class_="ipc-title__text")
-                title = title_tag.text.strip() if title_tag else None
-                title = title.split(". ")[1] if title else None
-
-                img_tag = container.find("img", class_="ipc-image")
-                if img_tag and "alt" in img_tag.attrs:
-                    alt_text = img_tag["alt"]
-                    cast = alt_text.split(" in ")[0]
-
-                # Extract year, duration, and category
-                metadata_div = container.find(
-                    "div", class_="sc-300a8231-6 dBUjvq dli-title-metadata")
-                year, duration, category = None, None, None
-                if metadata_div:
-                    metadata_items = metadata_div.find_all(
-                        "span", class_="sc-300a8231-7 eaXxft dli-title-metadata-item")
-                    if len(metadata_items) >= 1:
-                        year = metadata_items[0].text.strip()
-                    if len(metadata_items) >= 2:
-                        duration = metadata_items[1].text.strip()
-                    if len(metadata_items) >= 3:
-                        category = metadata_items[2].text.strip()
-
-                # Extract rating
-                rating_tag = container.find(
-                    "span", class_="ipc-rating-star--rating")
-                rating = rating_tag.text.strip() if rating_tag else None
-
-                # vote_count_tag = container.find(
-                #     "span", class_="ipc-rating-star--voteCount")
-                # vote_count = vote_count_tag.text.strip(
-                #     "()").strip() if vote_count_tag else None
-                # vote_count = vote_count.replace(
-                #     "(", "").replace(")", "") if vote_count else None
-
-                # Extract plot
-                plot_tag = container.find(
-                    "div", class_="ipc-html-content-inner-div")
-                plot = plot_tag.text.strip() if plot_tag else None
-
-                # Create movie dictionary
-                movie = {
-                    "title": title,
-                    "year": year,
-                    "duration": duration,
-                    "category": category,
-                    "rating": rating,
-                    "cast": cast,
-                    "plot": plot,
-                }
-                movies.append(movie)
-            except Exception as e:
-                logger.error(f"Error processing container: {e}")
-
-        # # Print the extracted movies
-        # for movie in movies:
-        #     print(movie)
-        logger.info(f"Scraped movie count is {len(movies)}")
+        movies = extract_movies(page_content)
+        logger.info("Scraped movie count is %d", len(movies))
         return movies
 
-    async def scrape_url(self, url: str, max_pages: int) -> List[Dict]:
+    async def scrape_url(self, url: str, max_pages: int) -> List[MovieRow]:
         """
         Scrapes multiple pages from the given URL and aggregates the results.
 
@@ -250,27 +276,40 @@ class Command(BaseCommand):
             max_pages (int): The maximum number of pages to scrape.
 
         Returns:
-            List[Dict]: A list of dictionaries containing movie data from all the scraped pages.
+            List[MovieRow]: A list of movies from all the scraped pages.
         """
-        results = await asyncio.gather(self.scrape_page(url, max_pages))
-        movies = [movie for page_movies in results for movie in page_movies]
-        return movies
+        # "50 more" pagination is click-driven, so one URL is one sequential fetch
+        return await self.scrape_page(url, max_pages)
 
-    def save_movies(self, movies: List[Dict]) -> None:
+    async def run_scraper(self, url: str, max_pages: int) -> List[MovieRow]:
+        """
+        Scrapes the given URL and releases the shared browser once scraping is done.
+
+        Args:
+            url (str): The base URL to scrape.
+            max_pages (int): The maximum number of pages to scrape.
+
+        Returns:
+            List[MovieRow]: A list of movies from all the scraped pages.
+        """
+        try:
+            return await self.scrape_url(url, max_pages)
+        finally:
+            await self.close_browser()
+
+    def save_movies(self, movies: List[MovieRow]) -> None:
         """
         Saves or updates movie records in the database based on the provided list of movies.
 
         Args:
-            movies (List[Dict]): A list of dictionaries containing movie data to be saved or updated.
-                                Each dictionary should include keys like "title", "year", "rating", 
-                                "cast", "plot", "duration", and "category".
+            movies (List[MovieRow]): A list of scraped movies to be saved or updated.
 
         Returns:
             None
 
         Logs:
             - Info if there are no movies to add or update.
-            - Info with counts of created and updated records after successful execution.
+            - Info with the count of inserted or updated records after successful execution.
             - Error if an exception occurs while saving or updating movies.
         """
         try:
@@ -278,71 +317,43 @@ class Command(BaseCommand):
                 logger.info("No movie to add or update")
                 return
 
-            titles = [movie["title"] for movie in movies]
-
-            # Retrieve existing movies
-            existing_movies = Movie.objects.filter(title__in=titles)
-            existing_movies_dict = {
-                movie.title: movie for movie in existing_movies}
-
-            new_movies = []
-            updates = []
-
-            for movie in movies:
-                if movie["title"] in existing_movies_dict:
-                    # Update the existing movie's attributes
-                    existing_movie = existing_movies_dict[movie["title"]]
-                    existing_movie.release_year = movie["year"]
-                    existing_movie.imdb_rating = movie["rating"]
-                    existing_movie.cast = movie["cast"]
-                    existing_movie.plot_summary = movie["plot"]
-                    existing_movie.duration = movie["duration"]
-                    existing_movie.category = movie["category"]
-                    updates.append(existing_movie)
-                else:
-                    # Add new movies
-                    new_movies.append(
-                        Movie(
-                            title=movie["title"],
-                            release_year=movie["year"],
-                            imdb_rating=movie["rating"],
-                            cast=movie["cast"],
-                            plot_summary=movie["plot"],
-                            duration=movie["duration"],
-                            category=movie["category"],
-                        )
-                    )
+            # A single upsert cannot touch the same row twice, so keep the last
+            # occurrence of each title; rows scraped without a title are dropped
+            unique_movies = {movie.title: movie for movie in movies if movie.title}
+            objs = [
+                Movie(
+                    title=movie.title,
+                    release_year=movie.year,
+                    imdb_rating=movie.rating,
+                    cast=movie.cast,
+                    plot_summary=movie.plot,
+                    duration=movie.duration,
+                    category=movie.category,
+                )
+                for movie in unique_movies.values()
+            ]
 
             with transaction.atomic():
-                # Bulk create new movies
-                Movie.objects.bulk_create(new_movies, ignore_conflicts=True)
-
-                # Bulk update existing movies
-                if updates:
-                    Movie.objects.bulk_update(
-                        updates,
-                        fields=["release_year", "imdb_rating", "cast",
-                                "plot_summary", "duration", "category"]
-                    )
-            logger.info(
-                f"Created {len(new_movies)} & updated {len(updates)} movie records")
+                # Insert new movies and update existing ones in one statement
+                Movie.objects.bulk_create(
+                    objs,
+                    update_conflicts=True,
+                    unique_fields=["title"],
+                    update_fields=["release_year", "imdb_rating", "cast",
+                                   "plot_summary", "duration", "category"],
+                    batch_size=500,
+                )
+            logger.info("Upserted %d movie records", len(objs))
         except Exception as e:
-            logger.error(f"Error saving movies: {e}")
+            logger.error("Error saving movies: %s", e)
 
     def handle(self, *args, **options):
-        genre = options["genre"]
-        title_type = options["title_type"]
-        user_rating = options.get("user_rating")
-        num_votes = options.get("num_votes")
-        release_year = options.get("release_year")
         pages_to_scrape = options.get("pages")
 
         try:
-            self.validate_arguments(genre, user_rating, release_year)
-            url = self.construct_url(
-                genre, title_type, user_rating, num_votes, release_year)
-            logger.info(f"Scraping IMDb with URL: {url}")
-            movies = asyncio.run(self.scrape_url(url, pages_to_scrape))
+            url = self._prepare(options)
+            logger.info("Scraping IMDb with URL: %s", url)
+            movies = asyncio.run(self.run_scraper(url, pages_to_scrape))
             self.save_movies(movies)
         except ValueError as e:
             logger.error(e)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-14 05:57
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_alter_movie_title'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='movie_title_lower_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 # models.py
 from django.db import models
+from django.db.models.functions import Lower
 from enum import Enum
 
 
@@ -13,6 +14,12 @@ class Movie(models.Model):
     cast = models.TextField(null=True, blank=True)
     plot_summary = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Backs the case-insensitive title lookups of the detail endpoint
+            models.Index(Lower("title"), name="movie_title_lower_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
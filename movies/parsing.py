@@ -0,0 +1,76 @@
+# parsing.py
+import logging
+import re
+from typing import List, NamedTuple, Optional
+from lxml import html
+from lxml.cssselect import CSSSelector
+
+logger = logging.getLogger(__name__)
+
+# Compiled once when the module is loaded and evaluated by libxml2
+SEL_ITEM = CSSSelector("li.ipc-metadata-list-summary-item")
+# Leading list rank of a result title, e.g. "12. " in "12. Dr. Strangelove"
+_RANK_RE = re.compile(r"^\d+\.\s+")
+
+
+class MovieRow(NamedTuple):
+    """A single movie scraped from an IMDb result list."""
+    title: Optional[str]
+    year: Optional[str] = None
+    duration: Optional[str] = None
+    category: Optional[str] = None
+    rating: Optional[str] = None
+    cast: Optional[str] = None
+    plot: Optional[str] = None
+
+
+def extract_movies(page_content: str) -> List[MovieRow]:
+    """
+    Parses the HTML of a result page and extracts every movie in its result list.
+
+    Args:
+        page_content (str): The full HTML of a result page.
+
+    Returns:
+        List[MovieRow]: A list of scraped movies. Returns an empty list if no data is found.
+    """
+    doc = html.fromstring(page_content)
+
+    # Find all movie containers
+    movie_containers = SEL_ITEM(doc)
+    movies = []
+
+    for container in movie_containers:
+        try:
+            title, cast, rating, plot = None, None, None, None
+            metadata_items = []
+
+            # Collect every field in a single walk over the container
+            for element in container.iter("h3", "img", "span", "div"):
+                classes = element.get("class", "").split()
+                tag = element.tag
+                if tag == "span":
+                    if "dli-title-metadata-item" in classes:
+                        metadata_items.append(element.text_content().strip())
+                    elif rating is None and "ipc-rating-star--rating" in classes:
+                        rating = element.text_content().strip()
+                elif tag == "h3":
+                    if title is None and "ipc-title__text" in classes:
+                        title = element.text_content().strip()
+                elif tag == "img":
+                    alt_text = element.get("alt")
+                    if cast is None and alt_text is not None and "ipc-image" in classes:
+                        cast = alt_text.split(" in ")[0]
+                elif plot is None and "ipc-html-content-inner-div" in classes:
+                    plot = element.text_content().strip()
+
+            title = _RANK_RE.sub("", title, count=1) if title else None
+            # Year, duration and category appear in this order
+            year, duration, category = (metadata_items + [None, None, None])[:3]
+
+            movies.append(
+                MovieRow(title, year, duration, category, rating, cast, plot))
+        except Exception as e:
+            logger.error("Error processing container: %s", e)
+
+    return movies
@@ -2,6 +2,7 @@ import logging
 import pytest
 from datetime import datetime
 from movies.management.commands.scrape_movies import Command
+from movies.parsing import MovieRow, extract_movies
 from movies.models import Movie, TitleType
 from unittest.mock import Mock, call, patch, MagicMock, AsyncMock
 
@@ -46,7 +47,7 @@ def test_add_arguments(command):
     # Check if parser.add_argument was called with expected arguments
     expected_calls = [
         call("--genre", type=str, required=True, help="Genre of the movies"),
-        call("--title_type", type=str, choices=[t.value for t in TitleType],
+        call("--title_type", type=str, choices=tuple(t.value for t in TitleType),
              default=TitleType.FEATURE.value, help="Type of the title (default: feature)"),
         call("--user_rating", type=float, help="User rating (1.0 to 10.0)"),
         call("--num_votes", type=int, help="Minimum number of votes"),
@@ -124,6 +125,23 @@ def test_construct_url_partial_arguments(command):
     assert url == expected_url
 
 
+def test_prepare_builds_url_from_options(command):
+    url = command._prepare({
+        "genre": "horror",
+        "title_type": "short",
+        "user_rating": 6.0,
+        "num_votes": None,
+        "release_year": None,
+        "pages": 1,
+    })
+    assert url == "https://www.imdb.com/search/title/?title_type=short&genres=horror&user_rating=6.0,10"
+
+
+def test_prepare_validates_options(command):
+    with pytest.raises(ValueError, match="Invalid genre: sci-fi"):
+        command._prepare({"genre": "sci-fi", "title_type": "feature"})
+
+
 # @pytest.mark.asyncio
 # @patch("movies.management.commands.scrape_movies.async_playwright")
 # async def test_fetch_all_pages_with_playwright(mock_playwright):
@@ -170,6 +188,49 @@ def test_construct_url_partial_arguments(command):
 #     await mock_page.locator.return_value.count()
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("resource_type, blocked", [
+    ("image", True),
+    ("font", True),
+    ("media", True),
+    ("document", False),
+    ("xhr", False),
+])
+async def test_block_heavy_resources(command, resource_type, blocked):
+    route = AsyncMock()
+    route.request = Mock(resource_type=resource_type)
+
+    await command.block_heavy_resources(route)
+
+    assert route.abort.await_count == (1 if blocked else 0)
+    assert route.continue_.await_count == (0 if blocked else 1)
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_pages_waits_for_new_titles(command):
+    items = Mock(count=AsyncMock(return_value=50))
+    button = Mock(count=AsyncMock(return_value=1), is_visible=AsyncMock(return_value=True),
+                  click=AsyncMock())
+    page = AsyncMock()
+    page.content.return_value = MOCK_HTML
+    page.locator = Mock(side_effect=lambda selector: button if "see-more" in selector else items)
+    context = AsyncMock()
+    context.new_page.return_value = page
+    browser = AsyncMock()
+    browser.new_context.return_value = context
+
+    with patch.object(command, "get_browser", AsyncMock(return_value=browser)):
+        content = await command.fetch_all_pages_with_playwright("http://example.com", 2)
+
+    assert content == MOCK_HTML
+    page.content.assert_awaited_once()
+    button.click.assert_awaited_once()
+    page.wait_for_function.assert_awaited_once()
+    assert page.wait_for_function.call_args[1]["arg"] == ["li.ipc-metadata-list-summary-item", 50]
+    page.wait_for_timeout.assert_not_awaited()
+    context.close.assert_awaited_once()
+
+
 @pytest.mark.asyncio
 @patch("movies.management.commands.scrape_movies.Command.fetch_all_pages_with_playwright", AsyncMock(return_value=MOCK_HTML))
 async def test_scrape_page():
@@ -180,35 +241,79 @@ async def test_scrape_page():
 
     assert len(movies) == 1
     movie = movies[0]
-    assert movie["title"] == "Movie Title 1"
-    assert movie["year"] == "2023"
-    assert movie["duration"] == "120 min"
-    assert movie["category"] == "Drama"
-    assert movie["rating"] == "8.5"
-    assert movie["cast"] == "Actor A, Actor B"
-    assert movie["plot"] == "A summary of the movie."
+    assert movie.title == "Movie Title 1"
+    assert movie.year == "2023"
+    assert movie.duration == "120 min"
+    assert movie.category == "Drama"
+    assert movie.rating == "8.5"
+    assert movie.cast == "Actor A, Actor B"
+    assert movie.plot == "A summary of the movie."
+
+
+MOCK_HTML_PARTIAL = """
+<html>
+    <body>
+        <ul class="ipc-metadata-list-summary">
+            <li class="ipc-metadata-list-summary-item">
+                <h3 class="ipc-title__text">2. Dr. Strangelove</h3>
+                <div class="dli-title-metadata">
+                    <span class="dli-title-metadata-item">2021</span>
+                </div>
+            </li>
+        </ul>
+    </body>
+</html>
+"""
+
+
+@pytest.mark.asyncio
+@patch("movies.management.commands.scrape_movies.Command.fetch_all_pages_with_playwright", AsyncMock(return_value=MOCK_HTML_PARTIAL))
+async def test_scrape_page_missing_fields():
+    from movies.management.commands.scrape_movies import Command
+
+    command = Command()
+    movies = await command.scrape_page("https://www.imdb.com/search/title/?title_type=feature&genres=comedy", 1)
+
+    assert len(movies) == 1
+    movie = movies[0]
+    assert movie.title == "Dr. Strangelove"
+    assert movie.year == "2021"
+    assert movie.duration is None
+    assert movie.category is None
+    assert movie.rating is None
+    assert movie.cast is None
+    assert movie.plot is None
+
+
+def test_extract_movies_ignores_items_inside_scripts():
+    page = MOCK_HTML.replace(
+        "<body>",
+        "<head><script>var tpl = '<li class=\"ipc-metadata-list-summary-item\">"
+        "<h3 class=\"ipc-title__text\">1. Ghost</h3></li>';</script></head><body>")
+
+    assert [movie.title for movie in extract_movies(page)] == ["Movie Title 1"]
 
 
 @pytest.mark.asyncio
 @patch("movies.management.commands.scrape_movies.Command.scrape_page", AsyncMock(return_value=[
-    {
-        "title": "Movie Title 1",
-        "year": "2023",
-        "duration": "120 min",
-        "category": "Drama",
-        "rating": "8.5",
-        "cast": "Actor A, Actor B",
-        "plot": "A summary of the movie.",
-    },
-    {
-        "title": "Movie Title 2",
-        "year": "2022",
-        "duration": "90 min",
-        "category": "Comedy",
-        "rating": "7.0",
-        "cast": "Actor C, Actor D",
-        "plot": "Another summary of a different movie.",
-    }
+    MovieRow(
+        title="Movie Title 1",
+        year="2023",
+        duration="120 min",
+        category="Drama",
+        rating="8.5",
+        cast="Actor A, Actor B",
+        plot="A summary of the movie.",
+    ),
+    MovieRow(
+        title="Movie Title 2",
+        year="2022",
+        duration="90 min",
+        category="Comedy",
+        rating="7.0",
+        cast="Actor C, Actor D",
+        plot="Another summary of a different movie.",
+    )
 ]))
 async def test_scrape_url():
     from movies.management.commands.scrape_movies import Command
@@ -219,80 +324,156 @@ async def test_scrape_url():
     assert len(movies) == 2
 
     movie1 = movies[0]
-    assert movie1["title"] == "Movie Title 1"
-    assert movie1["year"] == "2023"
-    assert movie1["duration"] == "120 min"
-    assert movie1["category"] == "Drama"
-    assert movie1["rating"] == "8.5"
-    assert movie1["cast"] == "Actor A, Actor B"
-    assert movie1["plot"] == "A summary of the movie."
+    assert movie1.title == "Movie Title 1"
+    assert movie1.year == "2023"
+    assert movie1.duration == "120 min"
+    assert movie1.category == "Drama"
+    assert movie1.rating == "8.5"
+    assert movie1.cast == "Actor A, Actor B"
+    assert movie1.plot == "A summary of the movie."
 
     movie2 = movies[1]
-    assert movie2["title"] == "Movie Title 2"
-    assert movie2["year"] == "2022"
-    assert movie2["duration"] == "90 min"
-    assert movie2["category"] == "Comedy"
-    assert movie2["rating"] == "7.0"
-    assert movie2["cast"] == "Actor C, Actor D"
-    assert movie2["plot"] == "Another summary of a different movie."
+    assert movie2.title == "Movie Title 2"
+    assert movie2.year == "2022"
+    assert movie2.duration == "90 min"
+    assert movie2.category == "Comedy"
+    assert movie2.rating == "7.0"
+    assert movie2.cast == "Actor C, Actor D"
+    assert movie2.plot == "Another summary of a different movie."
+
+
+@pytest.mark.asyncio
+@patch("movies.management.commands.scrape_movies.async_playwright")
+async def test_get_browser_launches_once(mock_playwright):
+    from movies.management.commands.scrape_movies import Command
+
+    mock_browser = AsyncMock()
+    mock_p = AsyncMock()
+    mock_p.chromium.launch.return_value = mock_browser
+    mock_playwright.return_value.start = AsyncMock(return_value=mock_p)
+
+    command = Command()
+    first = await command.get_browser()
+    second = await command.get_browser()
+
+    assert first is mock_browser
+    assert second is mock_browser
+    mock_p.chromium.launch.assert_awaited_once_with(headless=True)
+
+    await command.close_browser()
+    mock_browser.close.assert_awaited_once()
+    mock_p.stop.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch("movies.management.commands.scrape_movies.Command.close_browser", new_callable=AsyncMock)
+@patch("movies.management.commands.scrape_movies.Command.scrape_url", AsyncMock(side_effect=RuntimeError("boom")))
+async def test_run_scraper_closes_browser(mock_close_browser):
+    from movies.management.commands.scrape_movies import Command
+
+    command = Command()
+    with pytest.raises(RuntimeError):
+        await command.run_scraper("http://example.com", 1)
+
+    mock_close_browser.assert_awaited_once()
 
 
 @pytest.mark.django_db
 @patch("movies.models.Movie.objects.bulk_create")
-@patch("movies.models.Movie.objects.bulk_update")
-@patch("movies.models.Movie.objects.filter")
-def test_save_movies(mock_filter, mock_bulk_update, mock_bulk_create):
+def test_save_movies(mock_bulk_create):
     from movies.management.commands.scrape_movies import Command
 
     command = Command()
     movies = [
-        {
-            "title": "Movie Title 1",
-            "year": 2023,
-            "duration": "120 min",
-            "category": "Drama",
-            "rating": 8.5,
-            "cast": "Actor A, Actor B",
-            "plot": "A summary of the movie.",
-        },
-        {
-            "title": "Movie Title 2",
-            "year": 2022,
-            "duration": "90 min",
-            "category": "Comedy",
-            "rating": 7.5,
-            "cast": "Actor C, Actor D",
-            "plot": "Another summary.",
-        },
+        MovieRow(
+            title="Movie Title 1",
+            year=2023,
+            duration="120 min",
+            category="Drama",
+            rating=8.5,
+            cast="Actor A, Actor B",
+            plot="A summary of the movie.",
+        ),
+        MovieRow(
+            title="Movie Title 2",
+            year=2022,
+            duration="90 min",
+            category="Comedy",
+            rating=7.5,
+            cast="Actor C, Actor D",
+            plot="Another summary.",
+        ),
     ]
 
-    # Mock the database filter call to return existing movies
-    existing_movie = MagicMock(spec=Movie, title="Movie Title 1")
-    mock_filter.return_value = [existing_movie]
-
     # Call the method under test
     command.save_movies(movies)
 
-    # Assert that `Movie.objects.filter` was called with the correct titles
-    mock_filter.assert_called_once_with(
-        title__in=["Movie Title 1", "Movie Title 2"])
-
-    # Assert `bulk_create` was called with one new movie
+    # Assert a single upsert was issued for all movies
     mock_bulk_create.assert_called_once()
-    created_movies = mock_bulk_create.call_args[0][0]
-    assert len(created_movies) == 1
-    assert created_movies[0].title == "Movie Title 2"
-    assert created_movies[0].release_year == 2022
-    assert created_movies[0].imdb_rating == 7.5
-
-    # Assert `bulk_update` was called with the updated movie fields
-    mock_bulk_update.assert_called_once()
-    updated_movies = mock_bulk_update.call_args[0][0]
-    assert len(updated_movies) == 1
-    assert updated_movies[0].title == "Movie Title 1"
-    assert updated_movies[0].release_year == 2023
-    assert updated_movies[0].imdb_rating == 8.5
-    assert updated_movies[0].cast == "Actor A, Actor B"
-    assert updated_movies[0].plot_summary == "A summary of the movie."
-    assert updated_movies[0].duration == "120 min"
-    assert updated_movies[0].category == "Drama"
+    upserted_movies = mock_bulk_create.call_args[0][0]
+    kwargs = mock_bulk_create.call_args[1]
+    assert kwargs["update_conflicts"] is True
+    assert kwargs["unique_fields"] == ["title"]
+    assert kwargs["update_fields"] == ["release_year", "imdb_rating", "cast",
+                                       "plot_summary", "duration", "category"]
+
+    assert len(upserted_movies) == 2
+    assert upserted_movies[0].title == "Movie Title 1"
+    assert upserted_movies[0].release_year == 2023
+    assert upserted_movies[0].imdb_rating == 8.5
+    assert upserted_movies[0].cast == "Actor A, Actor B"
+    assert upserted_movies[0].plot_summary == "A summary of the movie."
+    assert upserted_movies[0].duration == "120 min"
+    assert upserted_movies[0].category == "Drama"
+    assert upserted_movies[1].title == "Movie Title 2"
+    assert upserted_movies[1].release_year == 2022
+    assert upserted_movies[1].imdb_rating == 7.5
+
+
+@pytest.mark.django_db
+def test_save_movies_updates_existing_records():
+    from movies.management.commands.scrape_movies import Command
+
+    Movie.objects.create(title="Movie Title 1", release_year="2020", imdb_rating=6.0)
+
+    command = Command()
+    command.save_movies([
+        MovieRow(
+            title="Movie Title 1",
+            year="2023",
+            duration="2h",
+            category="R",
+            rating=8.5,
+            cast="Actor A, Actor B",
+            plot="A summary of the movie.",
+        ),
+        MovieRow(
+            title="Movie Title 2",
+            year="2022",
+            duration="1h 30m",
+            category="PG",
+            rating=7.5,
+            cast="Actor C, Actor D",
+            plot="Another summary.",
+        ),
+    ])
+
+    assert Movie.objects.count() == 2
+    updated_movie = Movie.objects.get(title="Movie Title 1")
+    assert updated_movie.release_year == "2023"
+    assert updated_movie.imdb_rating == 8.5
+    assert updated_movie.cast == "Actor A, Actor B"
+
+
+@pytest.mark.django_db
+def test_save_movies_skips_rows_without_title():
+    from movies.management.commands.scrape_movies import Command
+
+    command = Command()
+    command.save_movies([
+        MovieRow(title=None, year="2021"),
+        MovieRow(title="Movie Title 1", year="2023", rating=8.5),
+        MovieRow(title="", year="2020"),
+    ])
+
+    assert list(Movie.objects.values_list("title", flat=True)) == ["Movie Title 1"]
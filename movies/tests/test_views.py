@@ -0,0 +1,70 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from movies.models import Movie
+
+
+@pytest.fixture
+def api_client():
+    """Fixture for the DRF test client."""
+    return APIClient()
+
+
+@pytest.mark.django_db
+def test_list_movies_is_paginated(api_client):
+    Movie.objects.bulk_create(
+        Movie(title=f"Movie {i:03d}", release_year="2020", cast="Actor", plot_summary="Plot")
+        for i in range(60)
+    )
+
+    response = api_client.get("/movies/")
+
+    assert response.status_code == 200
+    assert response.data["count"] == 60
+    assert len(response.data["results"]) == 50
+    assert response.data["results"][0]["title"] == "Movie 000"
+    assert "plot_summary" not in response.data["results"][0]
+
+    response = api_client.get("/movies/?page=2")
+    assert len(response.data["results"]) == 10
+
+
+@pytest.mark.django_db
+def test_list_movies_does_not_load_deferred_fields(api_client):
+    Movie.objects.bulk_create(Movie(title=f"Movie {i}") for i in range(5))
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get("/movies/")
+
+    assert response.status_code == 200
+    # One COUNT query for the paginator and one SELECT for the page
+    assert len(queries) == 2
+    assert "plot_summary" not in queries[1]["sql"]
+
+
+@pytest.mark.django_db
+def test_movie_detail_lookup_is_case_insensitive(api_client):
+    Movie.objects.create(title="Pulp Fiction", release_year="1994")
+
+    response = api_client.get("/movies/pulp fiction/")
+    assert response.status_code == 200
+    assert response.data["title"] == "Pulp Fiction"
+
+    response = api_client.get("/movies/unknown/")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_movie_detail_lookup_uses_lower_title_index():
+    from movies.views import get_movie_by_title
+
+    Movie.objects.create(title="Pulp Fiction")
+
+    with CaptureQueriesContext(connection) as queries:
+        get_movie_by_title("PULP FICTION")
+
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + queries[0]["sql"])
+        plan = " ".join(str(row) for row in cursor.fetchall())
+    assert "movie_title_lower_idx" in plan
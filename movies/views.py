@@ -1,9 +1,17 @@
 # views.py
+from django.db.models import Value
+from django.db.models.functions import Lower
 from rest_framework import generics, status
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .models import Movie
-from .serializers import MovieSerializer
+from .serializers import MovieSerializer, MovieListSerializer
+
+
+def get_movie_by_title(title):
+    # Compare LOWER(title) so the query can use movie_title_lower_idx
+    return Movie.objects.alias(title_lower=Lower("title")).get(title_lower=Lower(Value(title)))
 
 
 class MovieListCreateView(generics.ListCreateAPIView):
@@ -14,7 +22,7 @@ class MovieListCreateView(generics.ListCreateAPIView):
 class MovieDetailView(APIView):
     def get(self, request, title):
         try:
-            movie = Movie.objects.get(title__iexact=title)
+            movie = get_movie_by_title(title)
         except Movie.DoesNotExist:
             return Response({"error": "Movie not found"}, status=status.HTTP_404_NOT_FOUND)
         
@@ -30,7 +38,7 @@ class MovieDetailView(APIView):
         
     def put(self, request, title):
         try:
-            movie = Movie.objects.get(title__iexact=title)
+            movie = get_movie_by_title(title)
         except Movie.DoesNotExist:
             return Response({"error": "Movie not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -42,16 +50,20 @@ class MovieDetailView(APIView):
 
     def delete(self, request, title):
         try:
-            movie = Movie.objects.get(title__iexact=title)
+            movie = get_movie_by_title(title)
             movie.delete()
             return Response({"message": "Movie deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
         except Movie.DoesNotExist:
             return Response({"error": "Movie not found"}, status=status.HTTP_404_NOT_FOUND)
 
 
-class MovieListView(APIView):
-    def get(self, request):
-        movies = Movie.objects.all()
-        serializer = MovieSerializer(movies, many=True)
-        return Response(serializer.data)
+class MoviePagination(PageNumberPagination):
+    page_size = 50
+
 
+class MovieListView(generics.ListAPIView):
+    # Only load the columns the list serializer returns
+    queryset = Movie.objects.only(
+        "id", "title", "release_year", "duration", "category", "imdb_rating").order_by("title")
+    serializer_class = MovieListSerializer
+    pagination_class = MoviePagination